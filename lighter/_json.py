@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+# vim: set fileencoding=utf-8 :
+
+"""JSON encoding and decoding through the fastest library available
+
+If :py:mod:`orjson` is installed (``pip install lighter[fast]``), it is used.
+Otherwise, this falls back to the standard library.  Notice :py:func:`dumps`
+returns :obj:`bytes` with the former and :obj:`str` with the latter: both are
+accepted as HTTP request bodies.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, fall back to the standard library
+    orjson = None
+
+
+if orjson is not None:
+
+    dumps = orjson.dumps
+    loads = orjson.loads
+
+    def dumps_pretty(data):
+        """Formats data as indented JSON, for printing
+
+        orjson only supports indentation by 2 spaces.
+        """
+
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode()
+
+else:
+
+    dumps = json.dumps
+    loads = json.loads
+
+    def dumps_pretty(data):
+        """Formats data as indented JSON, for printing"""
+
+        return json.dumps(data, indent=4)
@@ -11,71 +11,228 @@ import json
 import time
 import select
 import requests
-import itertools
+import requests.adapters
+import urllib3.util.retry
 import datetime
+import contextlib
+import functools
 import threading
+import concurrent.futures
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-import dateutil.parser
+from . import _json
+
+_dumps = _json.dumps
+_loads = _json.loads
+
+try:
+    import ijson
+except ImportError:  # ijson is optional, responses are then fully buffered
+    ijson = None
 
 from . import color
+from .log import echo_normal
 
 
-def _id_predicate(actual_id, actual_name, target_id):
-    """Predicate to test actual identifiers and names against a target one"""
+_JSON_HEADERS = {"Content-Type": "application/json"}
 
-    return (
-        (isinstance(target_id, str) and actual_name.lower() == target_id)
-        or (isinstance(target_id, int) and int(actual_id) == target_id)
-        or (isinstance(target_id, re.Pattern) and target_id.match(actual_name))
-    )
 
+def _stream_loads(response):
+    """Decodes a streamed JSON object response, incrementally if possible
 
-def _handle_id(id):
-    """Handles None, integer, string or regexp identifiers with minimal
-    input"""
+    If :py:mod:`ijson` is available, the top-level object is built while the
+    body is still being received, without buffering the whole payload first.
+    Otherwise, this is equivalent to decoding the complete response contents.
+    """
 
-    # avoids a second conversion attempt
-    if not isinstance(id, (str)):
-        return id
+    if ijson is None:
+        return _loads(response.content)
+
+    response.raw.decode_content = True
+    retval = dict(ijson.kvitems(response.raw, "", use_float=True))
+    response.raw.read()  # drains the socket, so it returns to the pool
+    return retval
 
-    # it is a string
+
+def _response_errors(response):
+    """Returns error entries reported in the body of a response
+
+    Bodies are only decoded if they mention errors at all, so (the usual)
+    successful responses are not parsed.
+    """
+
+    if b'"error"' not in response.content:
+        return []
+    return [k for k in _loads(response.content) if "error" in k]
+
+
+def _parse_date(s):
+    """Parses a date reported by the server
+
+    The server reports ISO 8601 dates, which the standard library parses
+    quickly.  Anything else goes through the (much slower) :py:mod:`dateutil`
+    parser.
+    """
+
+    if s.endswith("Z"):  # not accepted by fromisoformat() before Python 3.11
+        s = s[:-1] + "+00:00"
     try:
-        id = int(id)
+        return datetime.datetime.fromisoformat(s)
     except ValueError:
-        # it is a string
-        if id.startswith("/") and id.endswith("/"):
-            id = re.compile(id[1:-1], flags=re.IGNORECASE)
-        else:
-            id = id.lower()
+        import dateutil.parser
+
+        return dateutil.parser.parse(s)
+
 
-    return id
+_RESTORE_DROP = frozenset(("alert", "reachable", "effect", "colormode"))
+"""Light state keys that cannot be restored"""
 
 
-def _uniq(seq, idfun=None):
-    """Very fast, order preserving uniq function for sequences"""
+_RESTORE_DROP_BY_COLORMODE = {
+    "ct": _RESTORE_DROP | {"xy", "hue", "sat"},
+    "xy": _RESTORE_DROP | {"ct", "hue", "sat"},
+    "hs": _RESTORE_DROP | {"ct", "xy"},
+}
+"""Light state keys not to restore, per color mode (the others conflict)"""
 
-    # order preserving
-    if idfun is None:
 
-        def idfun(x):
-            return x
+_REGEXP_METACHARACTERS = frozenset(".^$*+?{}[]\\|()")
 
-    seen = {}
-    result = []
-    for item in seq:
-        marker = idfun(item)
-        # in old Python versions:
-        # if seen.has_key(marker)
-        # but in new ones:
-        if marker in seen:
-            continue
-        seen[marker] = 1
-        result.append(item)
-    return result
+
+class _Prefix(str):
+    """A (lowercase) regular expression identifier without metacharacters
+
+    Such an expression is only ever matched (case-insensitively) at the start
+    of names, so it is tested with :py:meth:`str.startswith` instead of going
+    through the regular expression engine.
+    """
+
+    pass
+
+
+def _name_index(data):
+    """Indexes entries of an identifier to object mapping by lowercase name
+
+    Names are not unique on the server, so each name maps to a list of
+    identifiers.
+    """
+
+    retval = {}
+    for k, v in data.items():
+        retval.setdefault(v["name"].lower(), []).append(k)
+    return retval
+
+
+def _select(data, target_id, names=None):
+    """Selects entries from an identifier to object mapping
+
+    Integer identifiers select the entry with that key, strings select entries
+    whose lowercase name is equal to (or, for :py:class:`_Prefix`, starts
+    with) the identifier, and regular expressions select entries whose name
+    they match.  The type of ``target_id`` is only inspected once, and names
+    are looked up on an index instead of scanned.
+
+
+    Parameters
+    ----------
+
+    data : dict
+        A dictionary mapping string-integer identifiers to objects (e.g.
+        lights, groups or scenes), each with a ``name``
+
+    target_id : int, str, re.Pattern
+        An identifier, as returned by :py:func:`_handle_id`
+
+    names : :obj:`dict`, optional
+        A dictionary mapping lowercase names to lists of identifiers in
+        ``data``, as returned by :py:func:`_name_index`.  If not set, it is
+        calculated from ``data`` when needed.
+
+
+    Returns
+    -------
+
+    selected : dict
+        The entries of ``data`` matching ``target_id``
+    """
+
+    if isinstance(target_id, int):
+        # keys are canonical string representations of integers
+        k = str(target_id)
+        return {k: data[k]} if k in data else {}
+    if isinstance(target_id, str):
+        if names is None:
+            names = _name_index(data)
+        if isinstance(target_id, _Prefix):
+            return {k: data[k] for n, ks in names.items()
+                    if n.startswith(target_id) for k in ks}
+        return {k: data[k] for k in names.get(target_id, ())}
+    if isinstance(target_id, re.Pattern):
+        match = target_id.match  # bound once, called for every entry
+        return {k: v for k, v in data.items() if match(v["name"])}
+    return {}
+
+
+def _select_scenes(group, target_id):
+    """Selects scenes of a group, from the summary in the group information
+
+    Groups list their scenes (identifiers and names), so scenes can be
+    selected without querying the server for them.
+
+
+    Parameters
+    ----------
+
+    group : dict
+        Group information, e.g. as returned by :py:meth:`Server.get_groups`
+
+    target_id : int, str, re.Pattern
+        An identifier, as returned by :py:func:`_handle_id`
+
+
+    Returns
+    -------
+
+    scenes : dict
+        A dictionary mapping string-integer scene identifiers to the scene
+        summary (identifier and name) available in the group information
+    """
+
+    return _select({s["id"]: s for s in group["scenes"]}, target_id)
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_id(id):
+    """Parses a string identifier into an integer, lowercase name or regexp
+
+    Results are memoized, so that the same (regular expression) identifier is
+    only parsed once.
+    """
+
+    try:
+        return int(id)
+    except ValueError:
+        # it is a string
+        if id.startswith("/") and id.endswith("/"):
+            body = id[1:-1]
+            if _REGEXP_METACHARACTERS.isdisjoint(body):
+                return _Prefix(body.lower())
+            return re.compile(body, flags=re.IGNORECASE)
+        return id.lower()
+
+
+def _handle_id(id):
+    """Handles None, integer, string or regexp identifiers with minimal
+    input"""
+
+    # avoids a second conversion attempt (prefixes are already converted)
+    if not isinstance(id, str) or isinstance(id, _Prefix):
+        return id
+
+    return _parse_id(id)
 
 
 class _Getch:
@@ -120,8 +277,137 @@ class _GetchWindows:
 _getch = _Getch()
 
 
+_KEYWORDS = {
+    "off": {"on": False},
+    "0": {"on": False},
+    "0%": {"on": False},
+    "on": {"on": True},
+    "alert": {"alert": "lselect"},
+}
+"""Fixed keywords accepted when setting light states, and their settings"""
+
+
+_CT_NAMES = {
+    "candle": 2000,  # 2600 is min for IKEA/Philips lights?
+    "warm": 2700,
+    "warm+": 3000,
+    "soft": 3500,
+    "natural": 3700,
+    "cool": 4000,
+    "day-": 5000,  # 5190 is max for IKEA lights?
+    "day": 6500,  # 6500 is max for Philips lights?
+}
+"""Named white temperatures (in Kelvins) accepted when setting light states"""
+
+
+def _bri(perc):
+    """Converts to brightness scale from percentage"""
+    return int(round(255 * perc / 100.0))
+
+
+@functools.lru_cache(maxsize=32)
+def _mired(kelvin):
+    """Converts to CT scale (mireds) from Kelvins"""
+    return color.color_temperature_kelvin_to_mired(kelvin)
+
+
+def _ct(ct_bounds, kelvin):
+    """Converts to CT scale from Kelvins, respecting the light bounds"""
+
+    value = _mired(kelvin)
+
+    # we respect the maximum boundaries of the light - return
+    # whatever we can actually set.
+    if value < ct_bounds[0]:
+        logger.warning(
+            "Cannot set light color temperature to %d (minimum is %d)",
+            value,
+            ct_bounds[0],
+        )
+        value = ct_bounds[0]
+    if value > ct_bounds[1]:
+        logger.warning(
+            "Cannot set light color temperature to %d (maximum is %d)",
+            value,
+            ct_bounds[1],
+        )
+        value = ct_bounds[1]
+
+    return value
+
+
+@functools.lru_cache(maxsize=64)
+def _hs(kelvin):
+    """Converts to HS from Kelvins"""
+    return color.color_temperature_to_hs(kelvin)
+
+
+@functools.lru_cache(maxsize=64)
+def _xy(kelvin, gamut):
+    """Converts to XY from Kelvins"""
+    h, s = _hs(kelvin)
+    return color.color_hs_to_xy(h, s, gamut)
+
+
+@functools.lru_cache(maxsize=128)
+def _parse_values(values):
+    """Parses light state keywords, independently of the light being set
+
+    Results are memoized, so the same keywords are only parsed once.
+
+
+    Parameters
+    ----------
+
+    values : :obj:`tuple` of :obj:`str`
+        The keywords, as accepted by :py:meth:`Server._translate_light_state`
+
+
+    Returns
+    -------
+
+    settings : dict
+        Settings for the keywords that do not depend on the light (on, off,
+        alert and brightness).  It must not be modified.
+
+    temp : int
+        The white temperature requested, in Kelvins, or ``None``
+    """
+
+    # consumes keywords one by one, and set internal elements
+    settings = {}
+    temp = None
+    for key in values:
+
+        update = _KEYWORDS.get(key)
+        if update is not None:  # on, off, alert
+            settings.update(update)
+
+        elif key in _CT_NAMES:  # named temperature
+            temp = _CT_NAMES[key]
+
+        elif key.endswith("%"):  # brightness
+            settings["bri"] = _bri(int(key[:-1]))
+
+        elif key.endswith(("k", "K")):  # temperature
+            temp = int(key[:-1])
+
+        else:
+            raise RuntimeError(
+                'keyword "%s" is not recognized '
+                "when setting the light state" % key
+            )
+
+    return settings, temp
+
+
+@functools.lru_cache(maxsize=1)
 def setup_server():
-    """Sets up a connection to a deconz ReST API server"""
+    """Sets up a connection to a deconz ReST API server
+
+    The server (and so its HTTP session, connection pool and cache) is
+    created once and shared by all callers in the same process.
+    """
 
     from .config import load as config_load
 
@@ -136,6 +422,8 @@ def setup_server():
         transitiontime=config.get("transitiontime", 0),
         timeout=config.get("timeout", 5),
         retrydelay=config.get("retrydelay", 1.0),
+        cachettl=config.get("cachettl", 1.0),
+        maxconnections=config.get("maxconnections", 8),
     )
 
 
@@ -166,20 +454,115 @@ class Server:
         Time in seconds or fractions to wait for retries, if the server signals
         its busy.
 
+    cachettl : float
+        Time in seconds or fractions during which cached server information is
+        used without checking back with the server.  Changes issued through
+        this object always invalidate the affected information.  Set it to
+        zero to revalidate at every access.
+
+    maxconnections : int
+        Maximum number of simultaneous connections to the server.  This also
+        bounds the number of requests issued in parallel (e.g. when setting
+        the state of many lights).  Gateways tend to drop requests if too many
+        are sent at once.
+
     """
 
+    __slots__ = (
+        "host",
+        "port",
+        "_api_key",
+        "_lights_prefix",
+        "_groups_prefix",
+        "_cache_urls",
+        "transitiontime",
+        "timeout",
+        "retrydelay",
+        "cachettl",
+        "maxconnections",
+        "cache",
+        "session",
+        "_pool",
+        "_url_prefix",
+    )
+
     def __init__(self, host, port, api_key=None, transitiontime=0, timeout=5,
-            retrydelay=1.0):
+            retrydelay=1.0, cachettl=1.0, maxconnections=8):
         self.host = host
         self.port = port
+        self._url_prefix = "http://%s:%d/api/" % (host, port)
         self.api_key = api_key
         self.transitiontime = transitiontime
         self.timeout = timeout
         self.retrydelay = retrydelay
+        self.cachettl = cachettl
+        self.maxconnections = maxconnections
 
         # to cache server information
         self.cache = dict()
 
+        # persistent session, so sockets are reused between (batch) calls
+        self.session = requests.Session()
+        self.session.mount(
+            "http://",
+            requests.adapters.HTTPAdapter(
+                pool_connections=4,
+                pool_maxsize=maxconnections,  # one per pool worker
+                # transient errors are retried without dropping the socket
+                max_retries=urllib3.util.retry.Retry(
+                    total=5,
+                    backoff_factor=0.2,
+                    status_forcelist=(500, 502, 503, 504),
+                    raise_on_status=False,
+                ),
+            ),
+        )
+
+        # independent (per-light) requests are dispatched through this pool,
+        # started on first use (see :py:attr:`pool`)
+        self._pool = None
+
+    @property
+    def pool(self):
+        """Thread pool through which independent requests are dispatched
+
+        The pool is only started once needed, so read-only usage does not
+        spawn any threads.
+        """
+
+        if self._pool is None:
+            self._pool = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.maxconnections
+            )
+        return self._pool
+
+    def close(self):
+        """Releases pooled connections and worker threads held by the server
+        """
+
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        self.session.close()
+
+    @property
+    def api_key(self):
+        """The API key used to talk to the server"""
+        return self._api_key
+
+    @api_key.setter
+    def api_key(self, value):
+        self._api_key = value
+        # url parts prefixing most requests
+        self._lights_prefix = (value, "lights")
+        self._groups_prefix = (value, "groups")
+        # fixed addresses of the cached resources (see _cache_resource)
+        self._cache_urls = {
+            "config": "%s%s" % (self._url_prefix, value),
+            "lights": "%s%s/lights" % (self._url_prefix, value),
+            "groups": "%s%s/groups" % (self._url_prefix, value),
+        }
+
     def wait_user_or_timeout(self, timeout=None):
         """Waits for the user to push a key, or a timeout
 
@@ -198,89 +581,162 @@ class Server:
         """
 
         import tty
-        import tqdm
         import termios
 
+        try:
+            from tqdm import tqdm
+        except ImportError:  # tqdm is optional, just wait without a bar
+            tqdm = None
+
         fd = sys.stdin.fileno()
         old_settings = termios.tcgetattr(fd)
         timeout = timeout or self.timeout
         samples_per_second = 4
         wait_time = 1.0/samples_per_second
 
+        if tqdm is None:  # printed before raw mode, which breaks newlines
+            echo_normal('Press any key to continue (waiting %ds)...' % timeout)
+
         try:
             tty.setraw(sys.stdin.fileno())
-            with tqdm.tqdm(total=timeout, desc="Press any key to continue",
+            if tqdm is None:
+                pbar = contextlib.nullcontext()
+            else:
+                pbar = tqdm(total=timeout, desc="Press any key to continue",
                     bar_format="{desc}: {elapsed_s:2.2f}s|{bar}|%2.2fs" % \
-                    (timeout,)) as pbar:
+                    (timeout,))
+            with pbar:
                 for k in range(timeout*samples_per_second):
                     i, o, e = select.select([sys.stdin], [], [], wait_time)
                     if i:
                         text = sys.stdin.read(1)
                         logger.debug('Key typed (%s), stop waiting...', text)
                         break
-                    pbar.update(wait_time)
+                    if tqdm is not None:
+                        pbar.update(wait_time)
         finally:
             termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
 
-    def _cache_config(self):
-        """Reloads the configuration information from the server, if needs be
+    def _cache_resource(self, name):
+        """Reloads a resource from the server, if it changed since last time
+
+        The resource is revalidated with a conditional GET: the ETag stored
+        for the last copy is sent along, and the server answers with a 304
+        (not modified, empty body) if that copy is still current.  Copies
+        validated less than :py:attr:`cachettl` seconds ago are returned
+        without contacting the server.
+
+
+        Parameters
+        ----------
+
+        name : str
+            Name of the resource in the cache (one of ``config``, ``lights``
+            or ``groups``)
+
+
+        Returns
+        -------
+
+        data : dict
+            The (possibly cached) resource contents
         """
 
-        parts = [self.api_key]
+        now = time.monotonic()
+        if now - self.cache.get(name + "-time", -self.cachettl) < self.cachettl:
+            return self.cache[name]
 
-        if "config" not in self.cache:
-            response = self._get(parts)
-            self.cache["config"] = response.json()
-            self.cache["config-etag"] = response.headers["ETag"]
-        else:
-            response = self._get(parts, etag=self.cache["config-etag"])
-            if response.status_code == 304:  # not modified
-                assert response.headers["ETag"] == self.cache["config-etag"]
-            else:  # state was updated
-                self.cache["config"] = response.json()
-                self.cache["config-etag"] = response.headers["ETag"]
+        etag = self.cache.get(name + "-etag")
+        response = self._get_url(self._cache_urls[name], etag=etag,
+                stream=True)
 
-        return self.cache["config"]
+        if etag is not None and response.status_code == 304:  # not modified
+            response.raw.read()  # empty, returns the socket to the pool
+        elif not response.ok:  # errors are lists, never cache them
+            raise RuntimeError(
+                "Cannot load %s from server: %s"
+                % (
+                    name,
+                    ", ".join(
+                        k["error"]["description"]
+                        for k in _response_errors(response)
+                    )
+                    or response.reason,
+                )
+            )
+        else:  # first load, or state was updated
+            self.cache[name] = _stream_loads(response)
+            self.cache[name + "-etag"] = response.headers.get("ETag")
+            self.cache.pop(name + "-names", None)  # derived from old copy
+        self.cache[name + "-time"] = now
 
-    def _cache_lights(self):
-        """Reloads the lights information from the server, if needs be
+        return self.cache[name]
+
+    def _invalidate(self, parts):
+        """Forces the cached resource addressed by ``parts`` to be revalidated
+
+        Parameters
+        ----------
+
+        parts : :obj:`list` or :obj:`tuple` of :obj:`str`
+            A sequence of strings forming the url of a request that changed
+            the server state, like ``parts[0]/parts[1]/...``
         """
 
-        parts = [self.api_key, "lights"]
+        if len(parts) > 1:
+            self.cache.pop(parts[1] + "-time", None)
+            if parts[1] == "groups":  # actions and scenes change lights
+                self.cache.pop("lights-time", None)
+            elif parts[1] == "lights" and parts[-1] == "state":
+                # group states (any_on, all_on) and actions follow lights
+                self.cache.pop("groups-time", None)
 
-        if "lights" not in self.cache:
-            response = self._get(parts)
-            self.cache["lights"] = response.json()
-            self.cache["lights-etag"] = response.headers["ETag"]
-        else:
-            response = self._get(parts, etag=self.cache["lights-etag"])
-            if response.status_code == 304:  # not modified
-                assert response.headers["ETag"] == self.cache["lights-etag"]
-            else:  # state was updated
-                self.cache["lights"] = response.json()
-                self.cache["lights-etag"] = response.headers["ETag"]
+    def _cache_names(self, name):
+        """Returns an index by lowercase name for a cached resource
 
-        return self.cache["lights"]
+        The index is calculated once per copy of the resource, so that names
+        are not lowercased again at every look-up and exact name matches do
+        not require a scan.
 
-    def _cache_groups(self):
-        """Reloads the group information from the server
+
+        Parameters
+        ----------
+
+        name : str
+            Name of the resource in the cache (e.g. ``lights``).  It should
+            have been loaded before.
+
+
+        Returns
+        -------
+
+        names : dict
+            A dictionary mapping lowercase names to lists of string-integer
+            identifiers, as returned by :py:func:`_name_index`
         """
 
-        parts = [self.api_key, "groups"]
+        key = name + "-names"
+        if key not in self.cache:
+            self.cache[key] = _name_index(self.cache[name])
+        return self.cache[key]
 
-        if "groups" not in self.cache:
-            response = self._get(parts)
-            self.cache["groups"] = response.json()
-            self.cache["groups-etag"] = response.headers["ETag"]
-        else:
-            response = self._get(parts, etag=self.cache["groups-etag"])
-            if response.status_code == 304:  # not modified
-                assert response.headers.get("ETag") == self.cache["groups-etag"]
-            else:  # state was updated
-                self.cache["groups"] = response.json()
-                self.cache["groups-etag"] = response.headers["ETag"]
+    def _cache_config(self):
+        """Reloads the configuration information from the server, if needs be
+        """
 
-        return self.cache["groups"]
+        return self._cache_resource("config")
+
+    def _cache_lights(self):
+        """Reloads the lights information from the server, if needs be
+        """
+
+        return self._cache_resource("lights")
+
+    def _cache_groups(self):
+        """Reloads the group information from the server
+        """
+
+        return self._cache_resource("groups")
 
     def get_api_key(self):
         """Tries to fetch an API key from the deconz host
@@ -297,14 +753,13 @@ class Server:
                 logger.error(
                     "Server %s responded with a 403 (Forbidden) error - "
                     "link button not pressed.  Please click on Authenticate "
-                    "app ' at the gateway web interface" % api
+                    "app ' at the gateway web interface", self.host
                 )
-                logger.info("Sleeping for 1 second...")
-                time.sleep(1)
+                logger.info("Sleeping for 0.25 seconds...")
+                time.sleep(0.25)
             else:
-                self.api_key = r.json()[0]["success"]["username"]
+                self.api_key = _loads(r.content)[0]["success"]["username"]
                 return self.api_key
-                break
 
     def _api(self, parts):
         """Returns the wrapped address of the API
@@ -312,8 +767,8 @@ class Server:
         Parameters
         ----------
 
-        parts : :obj:`list` of :obj:`str`
-            A list of strings to join forming an url like
+        parts : :obj:`list` or :obj:`tuple` of :obj:`str`
+            A sequence of strings to join forming an url like
             ``parts[0]/parts[1]/...``
 
 
@@ -325,56 +780,93 @@ class Server:
             and the parts.
         """
 
-        return "http://%s:%d/api/%s" % (self.host, self.port, "/".join(parts))
+        return self._url_prefix + "/".join(parts)
 
-    def _post(self, parts, data):
+    def _post(self, parts, data, retry=3):
         """POST an API request
 
         Parameters
         ----------
 
-        parts : :obj:`list` of :obj:`str`
-            A list of strings to join forming an url like
+        parts : :obj:`list` or :obj:`tuple` of :obj:`str`
+            A sequence of strings to join forming an url like
             ``parts[0]/parts[1]/...``
 
         data : dict
             A dictionary with string -> string mappings that is transmitted
             with the request.
+
+
+        Returns
+        -------
+
+        response : requests.Response
+            An object containing the server response
         """
         url = self._api(parts)
-        data = json.dumps(data)
         logger.debug("POST '%s' data: %s", url, data)
-        response = requests.post(url, data=data)
+        response = self.session.post(url, data=_dumps(data),
+                headers=_JSON_HEADERS)
+        self._invalidate(parts)
         if not response.ok:
             logger.error("Unable to POST '%s' data: %s", url, data)
             logger.error(
                 "Returned %d (%s)", response.status_code, response.reason
             )
-        details = response.json()
-        for entry in details:
-            if "error" in entry:
-                if entry["error"]["type"] == 901 and retry > 0:
-                    logger.warning("Server got BUSY calling POST '%s' - " \
-                            "retrying (left: %d)", "/".join(parts), retry)
-                    time.sleep(self.retrydelay)
-                    return self._post(parts, data, retry-1)
-                logger.error("Call to POST '%s' data: %s returned:\n%s", url,
-                        data, json.dumps(entry, indent=2))
-        logger.debug("Response:\n%s", json.dumps(details, indent=2))
-
-    def _get(self, parts, etag=None):
+        for entry in _response_errors(response):
+            if entry["error"]["type"] == 901 and retry > 0:
+                logger.warning("Server got BUSY calling POST '%s' - " \
+                        "retrying (left: %d)", "/".join(parts), retry)
+                time.sleep(self.retrydelay)
+                return self._post(parts, data, retry-1)
+            logger.error("Call to POST '%s' data: %s returned:\n%s", url,
+                    data, json.dumps(entry, indent=2))
+        if response.content and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response: %s", response.text)
+        return response
+
+    def _get(self, parts, etag=None, stream=False):
         """GET an API request
 
         Parameters
         ----------
 
-        parts : :obj:`list` of :obj:`str`
-            A list of strings to join forming an url like
+        parts : :obj:`list` or :obj:`tuple` of :obj:`str`
+            A sequence of strings to join forming an url like
             ``parts[0]/parts[1]/...``
 
         etag : str
             If set, transmit the ETag header to the host
 
+        stream : :obj:`bool`, optional
+            If set, does not preload the response body, so it can be decoded
+            incrementally (see :py:func:`_stream_loads`)
+
+
+        Returns
+        -------
+
+        response : requests.Response
+            An object containing the server response
+        """
+
+        return self._get_url(self._api(parts), etag, stream)
+
+    def _get_url(self, url, etag=None, stream=False):
+        """GET an API request from a complete url
+
+        Parameters
+        ----------
+
+        url : str
+            The complete address of the resource to GET
+
+        etag : str
+            If set, transmit the ETag header to the host
+
+        stream : :obj:`bool`, optional
+            If set, does not preload the response body
+
 
         Returns
         -------
@@ -383,12 +875,11 @@ class Server:
             An object containing the server response
         """
 
-        url = self._api(parts)
         logger.debug("GET '%s'", url)
         headers = {}
         if etag is not None:
             headers["If-None-Match"] = etag
-        response = requests.get(url, headers=headers)
+        response = self.session.get(url, headers=headers, stream=stream)
         if not response.ok:
             logger.error("Unable to GET '%s'", url)
             logger.error(
@@ -402,8 +893,8 @@ class Server:
         Parameters
         ----------
 
-        parts : :obj:`list` of :obj:`str`
-            A list of strings to join forming an url like
+        parts : :obj:`list` or :obj:`tuple` of :obj:`str`
+            A sequence of strings to join forming an url like
             ``parts[0]/parts[1]/...``
 
         data : dict
@@ -412,26 +903,26 @@ class Server:
         """
 
         url = self._api(parts)
-        serial_data = json.dumps(data)
-        logger.debug("PUT '%s' data: %s", url, serial_data)
-        response = requests.put(url, data=serial_data)
+        logger.debug("PUT '%s' data: %s", url, data)
+        response = self.session.put(url, data=_dumps(data),
+                headers=_JSON_HEADERS)
+        self._invalidate(parts)
         if not response.ok:
-            logger.error("Unable to PUT '%s' data: %s", url, serial_data)
+            logger.error("Unable to PUT '%s' data: %s", url, data)
             logger.error(
                 "Returned %d (%s)", response.status_code, response.reason
             )
         #analyze response as well
-        details = response.json()
-        for entry in details:
-            if "error" in entry:
-                if entry["error"]["type"] == 901 and retry > 0:
-                    logger.warning("Server got BUSY calling PUT '%s' - " \
-                            "retrying (left: %d)", "/".join(parts), retry)
-                    time.sleep(self.retrydelay)
-                    return self._put(parts, data, retry-1)
-                logger.error("Call to PUT '%s' data: %s returned:\n%s", url,
-                        serial_data, json.dumps(entry, indent=2))
-        logger.debug("Response:\n%s", json.dumps(details, indent=2))
+        for entry in _response_errors(response):
+            if entry["error"]["type"] == 901 and retry > 0:
+                logger.warning("Server got BUSY calling PUT '%s' - " \
+                        "retrying (left: %d)", "/".join(parts), retry)
+                time.sleep(self.retrydelay)
+                return self._put(parts, data, retry-1)
+            logger.error("Call to PUT '%s' data: %s returned:\n%s", url,
+                    data, json.dumps(entry, indent=2))
+        if response.content and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response: %s", response.text)
 
     def _delete(self, parts, retry=3):
         """DELETE an API request
@@ -439,30 +930,30 @@ class Server:
         Parameters
         ----------
 
-        parts : :obj:`list` of :obj:`str`
-            A list of strings to join forming an url like
+        parts : :obj:`list` or :obj:`tuple` of :obj:`str`
+            A sequence of strings to join forming an url like
             ``parts[0]/parts[1]/...``
         """
 
         url = self._api(parts)
         logger.debug("DELETE '%s'", url)
-        response = requests.delete(url)
+        response = self.session.delete(url)
+        self._invalidate(parts)
         if not response.ok:
             logger.error("Unable to DELETE '%s'", url)
             logger.error(
                 "Returned %d (%s)", response.status_code, response.reason
             )
-        data = response.json()
-        for entry in data:
-            if "error" in entry:
-                if entry["error"]["type"] == 901 and retry > 0:
-                    logger.warning("Server got BUSY calling DELETE '%s' - " \
-                            "retrying (left: %d)", "/".join(parts), retry)
-                    time.sleep(self.retrydelay)
-                    return self._delete(parts, retry-1)
-                logger.error("Call to DELETE '%s' returned:\n%s", url,
-                        json.dumps(entry, indent=2))
-        logger.debug("Response:\n%s", json.dumps(data, indent=2))
+        for entry in _response_errors(response):
+            if entry["error"]["type"] == 901 and retry > 0:
+                logger.warning("Server got BUSY calling DELETE '%s' - " \
+                        "retrying (left: %d)", "/".join(parts), retry)
+                time.sleep(self.retrydelay)
+                return self._delete(parts, retry-1)
+            logger.error("Call to DELETE '%s' returned:\n%s", url,
+                    json.dumps(entry, indent=2))
+        if response.content and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Response: %s", response.text)
 
     def _translate_light_state(self, state, ct_bounds, manufacturer, model_id,
             values):
@@ -511,84 +1002,9 @@ class Server:
 
         """
 
-        def _bri(perc):
-            """Converts to brightness scale from percentage"""
-            return int(round(255 * perc / 100.0))
-
-        def _ct(kelvin):
-            """Converts to CT scale from Kelvins"""
-            value = color.color_temperature_kelvin_to_mired(kelvin)
-
-            # we respect the maximum boundaries of the light - return
-            # whatever we can actually set.
-            if value < ct_bounds[0]:
-                logger.warning(
-                    "Cannot set light color temperature to %d (minimum is %d)",
-                    value,
-                    ct_bounds[0],
-                )
-                value = ct_bounds[0]
-            if value > ct_bounds[1]:
-                logger.warning(
-                    "Cannot set light color temperature to %d (maximum is %d)",
-                    value,
-                    ct_bounds[1],
-                )
-                value = ct_bounds[1]
-
-            return value
-
-        def _hs(kelvin):
-            """Converts to HS from Kelvins"""
-            return color.color_temperature_to_hs(kelvin)
-
-        def _xy(kelvin, gamut):
-            """Converts to XY from Kelvins"""
-            h, s = _hs(kelvin)
-            return color.color_hs_to_xy(h, s, gamut)
-
-        # consumes keywords one by one, and set internal elements
         retval = {"transitiontime": self.transitiontime}
-
-        temp = None
-        for key in values:
-
-            if key in ["off", "0", "0%"]:
-                retval["on"] = False
-
-            elif key in ["on"]:
-                retval["on"] = True
-
-            elif key.endswith("%"):  # brightness
-                retval["bri"] = _bri(int(key[:-1]))
-
-            elif key.endswith("k"):  # temperature
-                temp = int(key[:-1])
-            elif key in ["candle"]:
-                temp = 2000  # 2600 is min for IKEA/Philips lights?
-            elif key in ["warm"]:
-                temp = 2700
-            elif key in ["warm+"]:
-                temp = 3000
-            elif key in ["soft"]:
-                temp = 3500
-            elif key in ["natural"]:
-                temp = 3700
-            elif key in ["cool"]:
-                temp = 4000
-            elif key in ["day-"]:
-                temp = 5000  # 5190 is max for IKEA lights?
-            elif key in ["day"]:
-                temp = 6500  # 6500 is max for Philips lights?
-
-            elif key in ["alert"]:
-                retval["alert"] = "lselect"
-
-            else:
-                raise RuntimeError(
-                    'keyword "%s" is not recognized '
-                    "when setting the light state" % key
-                )
+        settings, temp = _parse_values(tuple(values))
+        retval.update(settings)
 
         if state.get("colormode") is None:
             return {"on": retval["on"]}
@@ -611,9 +1027,9 @@ class Server:
                 #gamut = color.get_gamut(manufacturer, model_id)
                 #x, y = _xy(temp, gamut)
                 #retval["xy"] = [x, y]
-                retval["ct"] = _ct(temp)
+                retval["ct"] = _ct(tuple(ct_bounds), temp)
             else:  # mired color temperature
-                retval["ct"] = _ct(temp)
+                retval["ct"] = _ct(tuple(ct_bounds), temp)
 
         return retval
 
@@ -641,10 +1057,10 @@ class Server:
 
         config = self._cache_config()
         whitelist = config["config"]["whitelist"]
-        now = datetime.datetime.now()
         for key, info in whitelist.items():
-            last_used = dateutil.parser.parse(info["last use date"])
-            delta = now - last_used
+            last_used = _parse_date(info["last use date"])
+            # naive and aware dates cannot be subtracted from each other
+            delta = datetime.datetime.now(last_used.tzinfo) - last_used
             if delta.days > days_unused:
                 logger.info(
                     "Erasing API key '%s' that was last used %s (%d days ago)",
@@ -683,9 +1099,7 @@ class Server:
             return data
 
         # otherwise, apply filtering
-        candidates = dict(
-            [(k, v) for k, v in data.items() if _id_predicate(k, v["name"], id)]
-        )
+        candidates = _select(data, id, self._cache_names("lights"))
         logger.debug(
             "Returning %d out of %d total lights/switches",
             len(candidates),
@@ -714,9 +1128,14 @@ class Server:
             logger.warning("No lights affected by name change")
             return
 
-        for k, v in affected.items():
-            parts = [self.api_key, "lights", str(k)]
-            self._put(parts, data={"name": name})
+        list(
+            self.pool.map(
+                lambda k: self._put(
+                    self._lights_prefix + (k,), data={"name": name}
+                ),
+                affected,
+            )
+        )
 
     def _set_single_light(self, id, data):
         """Internal method to set a single light to a given state
@@ -732,7 +1151,7 @@ class Server:
             interface
 
         """
-        parts = [self.api_key, "lights", str(id), "state"]
+        parts = self._lights_prefix + (id, "state")
         self._put(parts, data=data)
 
     def _get_light_state_dict(self, d, values):
@@ -759,15 +1178,21 @@ class Server:
             defined in ``d``
         """
 
+        # lights with the same mode, bounds and model translate identically:
+        # only translate ``values`` once for each of those
+        cache = dict()
         state = dict()
         for k, v in d.items():
-            state[k] = self._translate_light_state(
-                v["state"], (v.get("ctmin", 250), v.get("ctmax", 454)),
-                v["manufacturername"], v["modelid"], values
-            )
+            ct_bounds = (v.get("ctmin", 250), v.get("ctmax", 454))
+            key = (v["state"].get("colormode"), v["state"].get("on"),
+                    ct_bounds, v["manufacturername"], v["modelid"])
+            if key not in cache:
+                cache[key] = self._translate_light_state(v["state"],
+                        ct_bounds, v["manufacturername"], v["modelid"], values)
+            state[k] = cache[key]
         return state
 
-    def _set_light_state_dict(self, d, values):
+    def _set_light_state_dict(self, d, values, group=None):
         """Internal method, set light state from dictionary
 
         This method will apply the stage change defined by ``values`` to all
@@ -786,11 +1211,58 @@ class Server:
             A list of strings that can be absorbed by
             :py:meth:`_translate_light_state`, that will be analyzed in
             sequence and applied to each light matched.
+
+        group : :obj:`tuple`, optional
+            If set, a tuple containing the identifier and information of a
+            group the lights in ``d`` belong to.  If ``d`` contains all lights
+            in that group and they are all to be set to the same state, then a
+            single group action is issued instead of one request per light.
         """
 
-        for k, v in self._get_light_state_dict(d, values).items():
-            logger.info("Set light '%s' to '%s'", d[k]["name"], " ".join(values))
-            self._set_single_light(k, v)
+        states = self._get_light_state_dict(d, values)
+        self._set_light_states(d, states,
+                dict.fromkeys(states, " ".join(values)), group)
+
+    def _set_light_states(self, d, states, descriptions, group=None):
+        """Internal method, sets precalculated light states
+
+        Parameters
+        ----------
+
+        d : dict
+            A dictionary, e.g. as returned by :py:meth:`get_lights`, containing
+            at least all lights in ``states``
+
+        states : dict
+            A dictionary mapping light identifiers to the settable states, as
+            returned by :py:meth:`_get_light_state_dict`
+
+        descriptions : dict
+            A dictionary mapping light identifiers to the user input that
+            generated their states, for logging purposes
+
+        group : :obj:`tuple`, optional
+            If set, a tuple containing the identifier and information of a
+            group the lights in ``states`` belong to.  If ``states`` contains
+            all lights in that group and they are all to be set to the same
+            state, then a single group action is issued instead of one request
+            per light.
+        """
+
+        if states and group is not None and \
+                len(states) == len(group[1]["lights"]):
+            common = list(states.values())
+            if all(k == common[0] for k in common[1:]):
+                logger.info("Set group '%s' to '%s'", group[1]["name"],
+                        next(iter(descriptions.values())))
+                parts = self._groups_prefix + (group[0], "action")
+                self._put(parts, data=common[0])
+                return
+
+        for k in states:
+            logger.info("Set light '%s' to '%s'", d[k]["name"], descriptions[k])
+        list(self.pool.map(lambda kv: self._set_single_light(*kv),
+            states.items()))
 
     def set_light_state(self, id, values):
         """Set light state
@@ -813,13 +1285,47 @@ class Server:
             sequence and applied to each light matched.
         """
 
+        # fails on invalid keywords before contacting the server (the result
+        # is memoized for the actual translation)
+        _parse_values(tuple(values))
+
         affected = self.get_lights(id)
 
         if not len(affected):
             logger.warning("No lights affected by state change")
             return
 
-        self._set_light_state_dict(affected, values)
+        group = self._group_with_lights(affected) if len(affected) > 1 \
+                else None
+        self._set_light_state_dict(affected, values, group)
+
+    def _group_with_lights(self, ids):
+        """Returns a group containing exactly the lights in ``ids``, if any
+
+        Used to replace per-light requests by a single group action.  No
+        groups are ever created on the server for this purpose.
+
+
+        Parameters
+        ----------
+
+        ids : :obj:`list` of :obj:`str`
+            The light identifiers to look for
+
+
+        Returns
+        -------
+
+        group : tuple
+            A tuple containing the group identifier and information, or
+            ``None``, if no group has exactly those lights
+        """
+
+        ids = set(ids)
+        for k, v in self._cache_groups().items():
+            if len(v["lights"]) == len(ids) and ids.issuperset(v["lights"]):
+                return k, v
+        return None
 
     def get_groups(self, id=None):
         """Returns all groups configured, or a specific one
@@ -850,9 +1356,7 @@ class Server:
             return data
 
         # otherwise, apply filtering
-        candidates = dict(
-            [(k, v) for k, v in data.items() if _id_predicate(k, v["name"], id)]
-        )
+        candidates = _select(data, id, self._cache_names("groups"))
         logger.debug(
             "Returning %d out of %d total groups", len(candidates), len(data)
         )
@@ -884,11 +1388,15 @@ class Server:
             in order.
         """
 
-        return _uniq(
-            itertools.chain.from_iterable(
-                [j for k in ids for j in self.get_lights(k)]
-            )
-        )
+        # a single cache access for all identifiers, deduplicated in order
+        data = self._cache_lights()
+        names = self._cache_names("lights")
+        retval = {}
+        for k in ids:
+            k = _handle_id(k)
+            retval.update(dict.fromkeys(data if k is None else
+                _select(data, k, names)))
+        return list(retval)
 
     def set_group_attrs(self, id, name=None, lights=None, hidden=None):
         """Set (some) group attributes, such as name, grouped lights and/or if
@@ -936,16 +1444,20 @@ class Server:
             lights = self._resolve_light_ids(lights)
             logger.debug("%d lights will be assigned to the group", len(lights))
 
-        for k in affected:
-            parts = [self.api_key, "groups", str(k)]
-            data = {}
-            if name is not None:
-                data["name"] = name
-            if lights is not None:
-                data["lights"] = lights
-            if hidden is not None:
-                data["hidden"] = hidden
-            self._put(parts, data=data)
+        data = {}
+        if name is not None:
+            data["name"] = name
+        if lights is not None:
+            data["lights"] = lights
+        if hidden is not None:
+            data["hidden"] = hidden
+
+        list(
+            self.pool.map(
+                lambda k: self._put(self._groups_prefix + (k,), data=data),
+                affected,
+            )
+        )
 
     def set_group_state(self, id, values):
         """Set group to a **single** state
@@ -968,6 +1480,10 @@ class Server:
             sequence and applied to each group matched.
         """
 
+        # fails on invalid keywords before contacting the server (the result
+        # is memoized for the actual translation)
+        _parse_values(tuple(values))
+
         affected = self.get_groups(id)
 
         if not len(affected):
@@ -976,13 +1492,20 @@ class Server:
 
         # for groups, we respect max/min color temperature for the
         # most restrictive lights (IKEA bulbs)
-        for k, v in affected.items():
-            parts = [self.api_key, "groups", str(k), "action"]
-            data = self._translate_light_state(v["action"], (250, 454),
-                    "generic", "nomodel", values)
-            self._put(parts, data=data)
+        actions = {
+            k: self._translate_light_state(v["action"], (250, 454),
+                "generic", "nomodel", values)
+            for k, v in affected.items()
+        }
+        list(
+            self.pool.map(
+                lambda kv: self._put(self._groups_prefix + (kv[0], "action"),
+                    data=kv[1]),
+                actions.items(),
+            )
+        )
 
-    def _select_lights_by_integer_id(self, ids):
+    def _select_lights_by_integer_id(self, ids, lights=None):
         """Selects all relevant group lights
 
         This method is similar to :py:meth:`get_group_lights`, except it only
@@ -997,6 +1520,11 @@ class Server:
             List of integer identifiers for light/switches in the format of a
             string.
 
+        lights : :obj:`dict`, optional
+            All lights, as returned by :py:meth:`get_lights` (with ``None``).
+            If not set, then fetch those from the server.  Set it when
+            selecting lights for many groups in a row.
+
 
         Returns
         -------
@@ -1007,8 +1535,9 @@ class Server:
             each of the ``ids``.
         """
 
-        lights = self.get_lights(None)  # gets all lights
-        return dict([(k, v) for k, v in lights.items() if k in ids])
+        if lights is None:
+            lights = self.get_lights(None)  # gets all lights
+        return {k: lights[k] for k in ids if k in lights}
 
     def get_group_lights(self, id):
         """Set the state of a specific light inside the group
@@ -1037,9 +1566,10 @@ class Server:
         if not len(affected):
             return {}
 
+        lights = self.get_lights(None)
         retval = {}
         for k, v in affected.items():
-            retval.update(self._select_lights_by_integer_id(v["lights"]))
+            retval.update(self._select_lights_by_integer_id(v["lights"], lights))
 
         return retval
 
@@ -1073,18 +1603,14 @@ class Server:
             logger.warning("No groups affected by state change")
             return
 
+        lights = self.get_lights(None)
+        light_id = _handle_id(light_id)
         for gk, gv in affected.items():
             # select light identifiers that match, from the group lights
-            group_lights = self._select_lights_by_integer_id(gv["lights"])
-            light_id = _handle_id(light_id)
-            affected_lights = dict(
-                [
-                    (k, v)
-                    for k, v in group_lights.items()
-                    if _id_predicate(k, v["name"], light_id)
-                ]
-            )
-            self._set_light_state_dict(affected_lights, values)
+            group_lights = self._select_lights_by_integer_id(gv["lights"],
+                    lights)
+            affected_lights = _select(group_lights, light_id)
+            self._set_light_state_dict(affected_lights, values, (gk, gv))
 
     def set_group_lights(self, id, config):
         """Set the states of lights in a group from a dictionary configuration
@@ -1098,14 +1624,43 @@ class Server:
 
         config : dict
             A dictionary mapping light identifiers (int, str) to state values
-            to which they will be set
+            to which they will be set.  Entries are applied in order: if more
+            than one entry matches a light, their settings are combined, and
+            the last one wins only for settings they both define.
 
         """
 
-        for k, v in config.items():
-            k = _handle_id(k)
-            self._set_group_light_state(id, k, v.split())
-            time.sleep(self.retrydelay)
+        affected = self.get_groups(id)
+
+        if not len(affected):
+            logger.warning("No groups affected by state change")
+            return
+
+        rules = [(_handle_id(k), v) for k, v in config.items()]
+
+        lights = self.get_lights(None)
+        for gk, gv in affected.items():
+            # select light identifiers that match, from the group lights
+            group_lights = self._select_lights_by_integer_id(gv["lights"],
+                    lights)
+
+            # literal names are looked up, not scanned, for every rule
+            names = _name_index(group_lights)
+
+            # accumulates the final state of each light, so each is only set
+            # once, in a single pass through the rules
+            states = dict()
+            descriptions = dict()
+            for light_id, values in rules:
+                affected_lights = _select(group_lights, light_id, names)
+                for k, v in self._get_light_state_dict(affected_lights,
+                        values.split()).items():
+                    # copies, translated states are shared between lights
+                    states[k] = {**states.get(k, {}), **v}
+                    descriptions[k] = " ".join(filter(None,
+                        (descriptions.get(k), values)))
+            self._set_light_states(group_lights, states, descriptions,
+                    (gk, gv))
 
     def store_scene(self, id, scene):
         """Stores the given scene
@@ -1132,13 +1687,9 @@ class Server:
                 "Scene storage can only affect one group "
                 "at a time.  You selected %d groups instead" % (len(group),)
             )
+        scene = _handle_id(scene)
         for k, v in group.items():
-            scene = _handle_id(scene)
-            candidates = [
-                s
-                for s in v["scenes"]
-                if _id_predicate(s["id"], s["name"], scene)
-            ]
+            candidates = list(_select_scenes(v, scene).values())
             if len(candidates) == 0:
                 logger.error("No scene being affected by scene storage")
                 continue
@@ -1149,19 +1700,12 @@ class Server:
                     % (len(candidates),)
                 )
             for s in candidates:
-                parts = [
-                    self.api_key,
-                    "groups",
-                    str(k),
-                    "scenes",
-                    s["id"],
-                    "store",
-                ]
+                parts = self._groups_prefix + (k, "scenes", s["id"], "store")
                 self._put(parts, data={"transitiontime": self.transitiontime})
 
-    def store_scene2(self, id, scene, config):
-        """Stores the given scene, given its desired properties
-
+    def _scene_light_requests(self, id, scene, config):
+        """Internal method, returns the requests to store a scene's light
+        states
 
         Parameters
         ----------
@@ -1176,6 +1720,14 @@ class Server:
         config : dict
             A dictionary mapping light identifiers (int, str) to state values
             to which they should be set
+
+
+        Returns
+        -------
+
+        requests : :obj:`list` of :obj:`tuple`
+            A list of (url parts, data) pairs, one for each light in each
+            matched scene, to be issued with :py:meth:`_put`
         """
 
         groups = self.get_groups(id)
@@ -1185,39 +1737,136 @@ class Server:
                 "Did not find any groups with id == '%s'" % (id,)
             )
 
+        # identifiers and values are the same for all groups
+        rules = [(_handle_id(k), v.split()) for k, v in config.items()]
+        scene = _handle_id(scene)
+
+        lights = self.get_lights(None)
+        retval = []
         for gk, gv in groups.items():
             # select light identifiers that match, from the group lights
-            group_lights = self._select_lights_by_integer_id(gv["lights"])
+            group_lights = self._select_lights_by_integer_id(gv["lights"],
+                    lights)
 
             # the resulting state to set lights in this scene/group is the
             # cumulative state by applying all changes listed, in the sequence
             # they were found
+            names = _name_index(group_lights)
             state_lights = dict()
-            for ck, cv in config.items():
-                light_id = _handle_id(ck)
-                affected_lights = dict(
-                    [
-                        (k, v)
-                        for k, v in group_lights.items()
-                        if _id_predicate(k, v["name"], light_id)
-                    ]
-                )
+            for light_id, values in rules:
+                affected_lights = _select(group_lights, light_id, names)
                 state_lights.update(self._get_light_state_dict(affected_lights,
-                    cv.split()))
+                    values))
 
-            scenes = self.get_scenes(gk, scene)
+            # no need to query scenes, their identifiers suffice
+            scenes = _select_scenes(gv, scene)
             if len(scenes) == 0:
                 raise RuntimeError(
                     "Did not find any scenes with id "
                     "== '%s' in group '%s'" % (scene, gv["name"])
                 )
 
-            for sk, sv in scenes.items():
-                # sets each light in the scene
-                for lk, lv in state_lights.items():
-                    parts = [self.api_key, 'groups', gk, 'scenes', sk,
-                            'lights', lk, 'state']
-                    self._put(parts, data=lv)
+            retval += [
+                (self._groups_prefix + (gk, "scenes", sk, "lights", lk,
+                    "state"), lv)
+                for sk in scenes
+                for lk, lv in state_lights.items()
+            ]
+
+        return retval
+
+    def store_scene2(self, id, scene, config):
+        """Stores the given scene, given its desired properties
+
+
+        Parameters
+        ----------
+
+        id : str, int
+            The group identifier (:obj:`int`) or its name (:obj:`str`)
+
+        scene : str, int
+            The scene identifier (:obj:`int`) or its name (:obj:`str`), within
+            the group
+
+        config : dict
+            A dictionary mapping light identifiers (int, str) to state values
+            to which they should be set
+        """
+
+        # sets each light in each scene, all independent requests
+        calls = self._scene_light_requests(id, scene, config)
+        list(self.pool.map(lambda pd: self._put(*pd), calls))
+
+    def store_scenes(self, config):
+        """Stores many scenes at once, given their desired properties
+
+        This is equivalent to calling :py:meth:`store_scene2` for each scene,
+        but all requests, for all scenes, are issued together.
+
+
+        Parameters
+        ----------
+
+        config : dict
+            A dictionary mapping group identifiers (int, str) to dictionaries
+            mapping scene identifiers (int, str) to light configurations, as
+            accepted by :py:meth:`store_scene2`
+        """
+
+        calls = [
+            call
+            for group, scenes in config.items()
+            for scene, lights in scenes.items()
+            for call in self._scene_light_requests(group, scene, lights)
+        ]
+        list(self.pool.map(lambda pd: self._put(*pd), calls))
+
+    def store_scene_with_restore(self, id, scene, config, old_state=None):
+        """Stores the given scene by setting lights, then restores them
+
+        This follows the sequence implemented in the Phoscon app, known to
+        work: the scene is recalled, lights are set following ``config``, the
+        scene is stored and lights are then restored to their previous state.
+        The user is given the chance to wait for lights to settle (see
+        :py:meth:`wait_user_or_timeout`) before the scene is stored and before
+        lights are restored.  To store a scene without touching the lights, use
+        :py:meth:`store_scene2`.
+
+
+        Parameters
+        ----------
+
+        id : str, int
+            The group identifier (:obj:`int`) or its name (:obj:`str`)
+
+        scene : str, int
+            The scene identifier (:obj:`int`) or its name (:obj:`str`), within
+            the group
+
+        config : dict
+            A dictionary mapping light identifiers (int, str) to state values
+            to which they should be set
+
+        old_state : :obj:`dict`, optional
+            The state to restore lights to, as returned by
+            :py:meth:`get_group_lights`.  If not set, it is taken before
+            touching the lights.
+        """
+
+        if old_state is None:
+            old_state = self.get_group_lights(id)
+
+        logger.info("Recalling scene '%s' on '%s'...", scene, id)
+        self.recall_scene(id, scene)
+        self.set_group_lights(id, config)
+        logger.info("Waiting for lights to change...")
+        self.wait_user_or_timeout()
+        self.store_scene(id, scene)
+        logger.info("Waiting for lights to store scene...")
+        self.wait_user_or_timeout()
+        logger.info("Restoring previous light state...")
+        self.restore_light_state(old_state)
 
     def restore_light_state(self, d):
         """Restores the state of lights given an input dictionary
@@ -1230,40 +1879,21 @@ class Server:
             to which they will be reset
         """
 
+        states = dict()
         for k, v in d.items():
             state = v["state"]
-            if "alert" in state:
-                del state["alert"]
-            if "reachable" in state:
-                del state["reachable"]
-            if "effect" in state:
-                del state["effect"]
             if "on" in state and not state["on"]:
                 state = dict(on=False)
-            if "colormode" in state:
-                cm = state["colormode"]
-                del state["colormode"]
-                if cm == "ct":
-                    if "xy" in state:
-                        del state["xy"]
-                    if "hue" in state:
-                        del state["hue"]
-                    if "sat" in state:
-                        del state["sat"]
-                if cm == "xy":
-                    if "ct" in state:
-                        del state["ct"]
-                    if "hue" in state:
-                        del state["hue"]
-                    if "sat" in state:
-                        del state["sat"]
-                if cm == "hs":
-                    if "ct" in state:
-                        del state["ct"]
-                    if "xy" in state:
-                        del state["xy"]
+            else:
+                # copies, so the cached light information is not changed
+                drop = _RESTORE_DROP_BY_COLORMODE.get(state.get("colormode"),
+                        _RESTORE_DROP)
+                state = {sk: sv for sk, sv in state.items() if sk not in drop}
             state["transitiontime"] = self.transitiontime
-            self._set_single_light(k, state)
+            states[str(k)] = state  # integer identifiers are also accepted
+
+        list(self.pool.map(lambda kv: self._set_single_light(*kv),
+            states.items()))
 
     def get_scenes(self, group, id=None):
         """Returns one or more scenes from a given group
@@ -1293,22 +1923,27 @@ class Server:
 
         id = _handle_id(id)
 
-        parts = [self.api_key, "groups", group, "scenes"]
-        candidates = self._get(parts).json()
+        parts = self._groups_prefix + (group, "scenes")
+
+        if isinstance(id, int):  # no need to list scenes, fetch it directly
+            # missing scenes are not requested, the server would report errors
+            info = self._cache_groups().get(str(group))
+            if info is not None and not _select_scenes(info, id):
+                return {}
+            response = self._get(parts + (str(id),))
+            if not response.ok:
+                return {}
+            return {str(id): _loads(response.content)}
+
+        candidates = _loads(self._get(parts).content)
         if id is not None:
-            candidates = dict(
-                [
-                    (k, v)
-                    for k, v in candidates.items()
-                    if _id_predicate(k, v["name"], id)
-                ]
-            )
+            candidates = _select(candidates, id)
 
-        retval = {}
-        for k in candidates:
-            parts_scenes = parts + [k]
-            retval[k] = self._get(parts_scenes).json()
-        return retval
+        # scenes are independent requests
+        details = self.pool.map(
+            lambda k: _loads(self._get(parts + (k,)).content), candidates
+        )
+        return dict(zip(candidates, details))
 
     def recall_scene(self, group, scene):
         """Recalls a given scene from a given group
@@ -1328,17 +1963,16 @@ class Server:
             match names of group on the server.
         """
 
-        group = _handle_id(group)
         scene = _handle_id(scene)
 
         groups = self.get_groups(group)
 
         recalled = 0
         for gk, gv in groups.items():
-            parts = [self.api_key, "groups", gk, "scenes"]
-            scenes = self.get_scenes(gk, scene)
-            for sk, sv in scenes.items():
-                parts_scene = parts + [sk, "recall"]
+            parts = self._groups_prefix + (gk, "scenes")
+            # no need to query scenes, their identifiers suffice
+            for sk in _select_scenes(gv, scene):
+                parts_scene = parts + (sk, "recall")
                 self._put(parts_scene, data={})
                 recalled += 1
 
@@ -7,7 +7,13 @@ import sys
 import logging
 
 import click
-import termcolor
+
+try:
+    from termcolor import colored
+except ImportError:  # termcolor is optional, output is then not colorized
+
+    def colored(text, *args, **kwargs):
+        return text
 
 
 # get the default root logger of lighter
@@ -76,7 +82,7 @@ class ColorLog(object):
         ]:
             if _supports_color():
                 return lambda s, *args: getattr(self._log, name)(
-                    termcolor.colored(s, **COLORMAP[name]), *args
+                    colored(s, **COLORMAP[name]), *args
                 )
             else:
                 return lambda s, *args: getattr(self._log, name)(s, *args)
@@ -105,7 +111,7 @@ def _echo(text, *args, **kwargs):
         :py:func:`termcolor.colored`
     """
 
-    click.echo(termcolor.colored(text, *args, **kwargs))
+    click.echo(colored(text, *args, **kwargs))
 
 
 def echo_normal(text):
@@ -1,13 +1,10 @@
 #!/usr/bin/env python
 # vim: set fileencoding=utf-8 :
 
-import json
-
 import click
-import pkg_resources
-from click_plugins import with_plugins
 
 from . import lighter
+from .utils import echo_json
 
 from ..deconz import setup_server
 
@@ -15,7 +12,6 @@ from ..log import verbosity_option, get_logger, echo_normal
 logger = get_logger(__name__)
 
 
-@with_plugins(pkg_resources.iter_entry_points("lighter.config.cli"))
 @click.group(cls=lighter.AliasedGroup)
 def config():
     """Commands for dealing with the global configuration
@@ -41,7 +37,7 @@ def get():
 
     server = setup_server()
     data = server.get_config()
-    print(json.dumps(data, indent=4))
+    echo_json(data)
 
 
 @config.command(
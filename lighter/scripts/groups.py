@@ -1,15 +1,12 @@
 #!/usr/bin/env python
 # vim: set fileencoding=utf-8 :
 
-import json
+import operator
 
-import yaml
 import click
-import pkg_resources
-from click_plugins import with_plugins
 
 from . import lighter
-from .utils import ordered_yaml_load
+from .utils import load_file, echo_json
 
 from ..log import verbosity_option, get_logger, echo_normal
 from ..deconz import setup_server
@@ -17,7 +14,6 @@ from ..deconz import setup_server
 logger = get_logger(__name__)
 
 
-@with_plugins(pkg_resources.iter_entry_points("lighter.groups.cli"))
 @click.group(cls=lighter.AliasedGroup)
 def groups():
     """Commands for dealing with individual light/switch groups
@@ -69,22 +65,26 @@ def get(id, summary, sort_name):
     data = server.get_groups(id)
 
     if not summary:
-        print(json.dumps(data, indent=4))
+        echo_json(data)
     else:  # just print overview
         if sort_name:
-            sorting = sorted(data.keys(), key=lambda x: data[x]["name"])
+            sorting = sorted(data, key=lambda x: data[x]["name"])
         else:
-            sorting = sorted(data.keys(), key=lambda x: int(x))
+            sorting = sorted(data, key=int)
+
+        name_key = operator.itemgetter("name")
 
         lights = server.get_lights(None)  # cross match all lights
 
         for k in sorting:
-            state = "OFF"
-            if data[k]["state"]["any_on"]:
-                state = "PARTIALLY ON"
-            if data[k]["state"]["all_on"]:
-                state = "ON"
-            state = "ON" if data[k]["state"]["any_on"] else "OFF"
+            group_state = data[k]["state"]
+            state = (
+                "ON"
+                if group_state["all_on"]
+                else "PARTIALLY ON"
+                if group_state["any_on"]
+                else "OFF"
+            )
             echo_normal(
                 "%s: %s (%s scenes, %d lights) [%s]"
                 % (
@@ -100,7 +100,7 @@ def get(id, summary, sort_name):
             echo_normal("  Scenes:")
             scenes = data[k]["scenes"]
             if sort_name:
-                scenes_sorting = sorted(scenes, key=lambda x: x["name"])
+                scenes_sorting = sorted(scenes, key=name_key)
             else:
                 scenes_sorting = sorted(scenes, key=lambda x: int(x["id"]))
             for sk in scenes_sorting:
@@ -108,21 +108,15 @@ def get(id, summary, sort_name):
 
             # print light information
             echo_normal("  Lights:")
-            group_lights = dict(
-                [
-                    (lk, lv)
-                    for lk, lv in lights.items()
-                    if lk in data[k]["lights"]
-                ]
-            )
+            group_lights = {
+                lk: lights[lk] for lk in data[k]["lights"] if lk in lights
+            }
             if sort_name:
                 light_sorting = sorted(
-                    group_lights.keys(), key=lambda x: group_lights[x]["name"]
+                    group_lights, key=lambda x: group_lights[x]["name"]
                 )
             else:
-                light_sorting = sorted(
-                    group_lights.keys(), key=lambda x: int(x)
-                )
+                light_sorting = sorted(group_lights, key=int)
 
             for k in light_sorting:
                 state = "ON" if group_lights[k]["state"]["on"] else "OFF"
@@ -286,7 +280,8 @@ def scene(id, file):
     light by light.  The input file must be a YAML dictionary mapping the state
     of the various ligths.  Keys must be light identifiers (name or integer
     id), or even a regular expression (prefix/suffix it with the character
-    '/').  Order matters. Example:
+    '/').  Order matters.  Files ending in ".json" are read as JSON instead,
+    which loads faster for large inputs. Example:
 
     \b
     /.*/: off
@@ -312,6 +307,5 @@ def scene(id, file):
     """
 
     server = setup_server()
-    with open(file, "rb") as f:
-        states = ordered_yaml_load(f)
+    states = load_file(file)
     server.set_group_lights(id, states)
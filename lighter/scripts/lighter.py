@@ -4,14 +4,51 @@
 """Main entry point for lighter."""
 
 import os
-import pkg_resources
 
 import click
-from click_plugins import with_plugins
 
 from ..log import setup
 logger = setup("lighter")
 
+try:
+    from click_plugins import with_plugins
+except ImportError:  # click-plugins is optional
+
+    def with_plugins(plugins):
+        """Registers the commands in ``plugins`` on the decorated group
+
+        Minimal replacement for :py:func:`click_plugins.with_plugins`, used
+        if that is not installed.  Commands that fail to load raise instead
+        of being replaced by a broken-command stub.
+        """
+
+        def decorator(group):
+            for ep in plugins:
+                group.add_command(ep.load(), ep.name)
+            return group
+
+        return decorator
+
+
+def entry_points(group):
+    """Returns the entry points registered for a group
+
+    Uses :py:mod:`importlib.metadata`, which is a lot faster to import and
+    query than ``pkg_resources``.
+    """
+
+    try:
+        from importlib.metadata import entry_points as _entry_points
+    except ImportError:  # Python < 3.8
+        import pkg_resources
+
+        return list(pkg_resources.iter_entry_points(group))
+
+    try:
+        return _entry_points(group=group)
+    except TypeError:  # Python < 3.10
+        return _entry_points().get(group, [])
+
 
 class AliasedGroup(click.Group):
     """Class that handles prefix aliasing for commands."""
@@ -56,7 +93,7 @@ if "LC_ALL" not in os.environ:
     os.environ["LC_ALL"] = "en_US.UTF-8"
 
 
-@with_plugins(pkg_resources.iter_entry_points("lighter.cli"))
+@with_plugins(entry_points("lighter.cli"))
 @click.group(
     cls=AliasedGroup,
     context_settings=dict(help_option_names=["-?", "-h", "--help"]),
@@ -1,13 +1,10 @@
 #!/usr/bin/env python
 # vim: set fileencoding=utf-8 :
 
-import json
-
 import click
-import pkg_resources
-from click_plugins import with_plugins
 
 from . import lighter
+from .utils import echo_json
 
 from ..log import verbosity_option, get_logger, echo_normal, echo_info
 from ..deconz import setup_server
@@ -15,7 +12,6 @@ from ..deconz import setup_server
 logger = get_logger(__name__)
 
 
-@with_plugins(pkg_resources.iter_entry_points("lighter.lights.cli"))
 @click.group(cls=lighter.AliasedGroup)
 def lights():
     """Commands for dealing with individual lights
@@ -78,23 +74,26 @@ def get(id, summary, sort_name):
     data = server.get_lights(id)
 
     if not summary:
-        echo_normal(json.dumps(data, indent=4))
+        echo_json(data)
     else:  # just print overview
         if sort_name:
-            sorting = sorted(data.keys(), key=lambda x: data[x]["name"])
+            items = sorted(data.items(), key=lambda kv: kv[1]["name"])
         else:
-            sorting = sorted(data.keys(), key=lambda x: int(x))
+            items = sorted(data.items(), key=lambda kv: int(kv[0]))
 
-        for k in sorting:
-            state = "ON" if data[k]["state"]["on"] else "OFF"
+        # a single write for the whole summary
+        if items:
             echo_normal(
-                "%s: %s (%s, %s) [%s]"
-                % (
-                    k,
-                    data[k]["name"],
-                    data[k]["type"],
-                    data[k]["manufacturername"],
-                    state,
+                "\n".join(
+                    "%s: %s (%s, %s) [%s]"
+                    % (
+                        k,
+                        v["name"],
+                        v["type"],
+                        v["manufacturername"],
+                        "ON" if v["state"]["on"] else "OFF",
+                    )
+                    for k, v in items
                 )
             )
 
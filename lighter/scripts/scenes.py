@@ -1,15 +1,10 @@
 #!/usr/bin/env python
 # vim: set fileencoding=utf-8 :
 
-import json
-
-import yaml
 import click
-import pkg_resources
-from click_plugins import with_plugins
 
 from . import lighter
-from .utils import ordered_yaml_load
+from .utils import load_file, echo_json
 
 from ..log import verbosity_option, get_logger, echo_normal
 from ..deconz import setup_server
@@ -17,7 +12,6 @@ from ..deconz import setup_server
 logger = get_logger(__name__)
 
 
-@with_plugins(pkg_resources.iter_entry_points("lighter.scenes.cli"))
 @click.group(cls=lighter.AliasedGroup)
 def scenes():
     """Commands for dealing with individual scenes
@@ -65,7 +59,7 @@ def get(id, scene, sort_name):
     for k in groups:
         print("Group: %s" % k)
         data = server.get_scenes(k, scene)
-        print(json.dumps(data, indent=4))
+        echo_json(data)
 
 
 @scenes.command(
@@ -89,9 +83,17 @@ Examples:
     type=click.Path(exists=True, file_okay=True, dir_okay=False),
     required=True,
 )
+@click.option(
+    "-d",
+    "--direct/--no-direct",
+    default=False,
+    help="If set, then write the light states of the scene directly, instead "
+    "of setting lights and storing the scene.  Lights are not touched, so "
+    "there is nothing to wait for or restore",
+)
 @verbosity_option()
 @lighter.raise_on_error
-def set(id, scene, file):
+def set(id, scene, file, direct):
     """Resets a scene by id or name
 
     For more details about the YAML file input, please consult the command
@@ -103,22 +105,15 @@ def set(id, scene, file):
 
     server = setup_server()
 
-    # store current light state, so it can be recovered
-    old_state = server.get_group_lights(id)
+    # loads the input YAML (or JSON) file
+    states = load_file(file)
 
-    # loads the input YAML file
-    with open(file, "rb") as f:
-        states = ordered_yaml_load(f)
+    if direct:
+        server.store_scene2(id, scene, states)
+        return
 
-    # this is the order implemented in phoscon app that is known to work
-    server.recall_scene(group, scene)
-    server.set_group_lights(id, states)
-    echo_normal("Waiting for %s lights to stabilize..." % (group,))
-    server.wait_user_or_timeout()
-    server.store_scene(id, scene)
-    echo_normal("Waiting for %s lights to store scene %s..." % (group, scene,))
-    server.wait_user_or_timeout()
-    server.restore_light_state(old_state)
+    echo_normal("Setting scene \"%s\" on \"%s\"" % (scene, id))
+    server.store_scene_with_restore(id, scene, states)
 
 
 @scenes.command(
@@ -155,7 +150,9 @@ Examples:
         ...
 
     Keys for groups and scenes may be integer or string identifiers.  Keys for
-    each light may be integer, string or regular expressions.
+    each light may be integer, string or regular expressions.  Files ending in
+    ".json" are read as JSON (with the same organization) instead, which loads
+    faster for large inputs.
 
 """
 )
@@ -170,9 +167,17 @@ Examples:
     type=int,
     help="Overrides default timeout from .lighter.json",
 )
+@click.option(
+    "-d",
+    "--direct/--no-direct",
+    default=False,
+    help="If set, then write the light states of all scenes directly, in one "
+    "batch, instead of setting lights and storing each scene in turn.  "
+    "Lights are not touched, so there is nothing to wait for or restore",
+)
 @verbosity_option()
 @lighter.raise_on_error
-def setmany(file, timeout):
+def setmany(file, timeout, direct):
     """Resets all listed scenes
 
     After setting the scene, the previous state of lights is recovered
@@ -180,29 +185,23 @@ def setmany(file, timeout):
 
     server = setup_server()
 
-    # loads the input YAML file
-    with open(file, "rb") as f:
-        groups = ordered_yaml_load(f)
+    # loads the input YAML (or JSON) file
+    groups = load_file(file)
+
+    if direct:
+        echo_normal("Storing %d scene(s) directly..."
+                % sum(len(k) for k in groups.values()))
+        server.store_scenes(groups)
+        return
 
     timeout = timeout or server.timeout
     server.timeout = timeout
     for group, scenes in groups.items():
+        # lights are restored after each scene, one snapshot is enough
+        old_state = server.get_group_lights(group)
         for scene, lights in scenes.items():
-            # how it is implemented in phoscon app
             echo_normal("Setting scene \"%s\" on \"%s\"" % (scene, group))
-            old_state = server.get_group_lights(group)
-            logger.info("Recalling scene...")
-            server.recall_scene(group, scene)
-            #logger.info("Waiting for scene to stabilize...")
-            #server.wait_user_or_timeout()
-            server.set_group_lights(group, lights)
-            logger.info("Waiting for lights to change...")
-            server.wait_user_or_timeout()
-            server.store_scene(group, scene)
-            logger.info("Waiting for lights to store scene...")
-            server.wait_user_or_timeout()
-            logger.info("Restoring previous light state...")
-            server.restore_light_state(old_state)
+            server.store_scene_with_restore(group, scene, lights, old_state)
 
 
 @scenes.command(
@@ -3,18 +3,67 @@
 
 """Helpers for our command-line interface"""
 
-import yaml
-import collections
+import os
+import sys
+import json
+import functools
 
+from .. import _json
+from .._json import dumps_pretty
 
-def ordered_yaml_load(
-    stream, Loader=yaml.Loader, object_pairs_hook=collections.OrderedDict
-):
+
+def echo_json(data):
+    """Prints data as indented JSON on the standard output
+
+    With :py:mod:`orjson`, if the output is not a terminal, the encoded bytes
+    are written directly, skipping decoding and re-encoding through the text
+    layer.  Without it, output is written as it is encoded, so the whole
+    document is never held in memory as a string.
+    """
+
+    orjson = _json.orjson
+
+    if orjson is None:
+        write = sys.stdout.write
+        for chunk in json.JSONEncoder(indent=4).iterencode(data):
+            write(chunk)
+        write("\n")
+        return
+
+    buffer = getattr(sys.stdout, "buffer", None)
+    if buffer is None or sys.stdout.isatty():
+        sys.stdout.write(dumps_pretty(data) + "\n")
+        return
+
+    sys.stdout.flush()  # keeps ordering with previous text output
+    buffer.write(
+        orjson.dumps(
+            data, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE
+        )
+    )
+    buffer.flush()
+
+
+def ordered_yaml_load(stream, Loader=None, object_pairs_hook=dict):
     """Loads a YAML data source, preserving dictionary order
 
+    Plain dictionaries preserve insertion order, so the loader's own mapping
+    constructor is used unless another ``object_pairs_hook`` is requested.  If
+    ``Loader`` is not set, the C (libyaml) safe loader is used, if available,
+    as it is a lot faster.
+
     From: https://stackoverflow.com/questions/5121931/in-python-how-can-you-load-yaml-mappings-as-ordereddicts
     """
 
+    # only imported when needed, commands not loading YAML skip its import
+    import yaml
+
+    if Loader is None:
+        Loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+    if object_pairs_hook is dict:
+        return yaml.load(stream, Loader)
+
     class OrderedLoader(Loader):
         pass
 
@@ -27,3 +76,27 @@ def ordered_yaml_load(
     )
 
     return yaml.load(stream, OrderedLoader)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_file(path, mtime):
+    """Loads a YAML or JSON file, memoized by path and modification time"""
+
+    # a single read lets the parser scan a buffer, instead of calling back
+    # into Python for every chunk of the file
+    with open(path, "rb") as f:
+        data = f.read()
+    if path.endswith(".json"):  # a lot faster to parse than YAML
+        return _json.loads(data)
+    return ordered_yaml_load(data)
+
+
+def load_file(path):
+    """Loads a YAML file, or a JSON file (``.json``), preserving dictionary
+    order
+
+    Files are only parsed again if they changed since they were last loaded.
+    The returned object is shared between calls and should not be modified.
+    """
+
+    return _load_file(path, os.path.getmtime(path))
@@ -16,15 +16,18 @@ setup(
     include_package_data=True,
     zip_safe=False,
     install_requires=[
-        "setuptools",
         "click>=7",
-        "click-plugins",
         "requests",
-        "termcolor",
         "pyyaml>=5.1",
-        "python-dateutil",
-        "tqdm",
+        'setuptools; python_version < "3.8"',  # pkg_resources
     ],
+    extras_require={
+        "fast": ["orjson", "ijson>=3.1"],
+        "progress": ["tqdm"],
+        "colors": ["termcolor"],
+        "plugins": ["click-plugins"],
+        "dates": ["python-dateutil"],
+    },
     entry_points={
         "console_scripts": ["lighter = lighter.scripts.lighter:main"],
         "lighter.cli": [
@@ -33,28 +36,6 @@ setup(
             'groups = lighter.scripts.groups:groups',
             'scenes = lighter.scripts.scenes:scenes',
             ],
-        "lighter.config.cli": [
-            'get = lighter.scripts.config:get',
-            'apikey = lighter.scripts.config:apikey',
-            ],
-        "lighter.lights.cli": [
-            'get = lighter.scripts.lights:get',
-            'name = lighter.scripts.lights:name',
-            'state = lighter.scripts.lights:state',
-            ],
-        "lighter.groups.cli": [
-            'get = lighter.scripts.groups:get',
-            'name = lighter.scripts.groups:name',
-            'member = lighter.scripts.groups:member',
-            'state = lighter.scripts.groups:state',
-            'scene = lighter.scripts.groups:scene',
-            ],
-        "lighter.scenes.cli": [
-            'get = lighter.scripts.scenes:get',
-            'set = lighter.scripts.scenes:set',
-            'setmany = lighter.scripts.scenes:setmany',
-            'recall = lighter.scripts.scenes:recall',
-            ],
     },
     classifiers=[
         "Development Status :: 4 - Beta",